@@ -45,6 +45,7 @@ requirements_all = requirements_easy.union([
     'psutil',        # figure out how much memory we have
     'glooey',        # make GUI applications with 3D stuff
     'jsonschema',    # validate JSON schemas like GLTF
+    'orjson',        # serialize JSON faster, like GLTF headers
     'scikit-image'])  # marching cubes and other nice stuff
 
 # requirements for running unit tests
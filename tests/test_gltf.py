@@ -151,6 +151,278 @@ class GLTFTest(g.unittest.TestCase):
         # make basic assertions
         g.scene_equal(scene, reloaded)
 
+    def test_shared_texture(self):
+        # two meshes sharing one textured material
+        a = g.get_mesh('fuze.ply')
+        b = a.copy()
+        b.apply_translation([10, 0, 0])
+        b.visual.material = a.visual.material
+        scene = g.trimesh.Scene([a, b])
+        assert len(scene.geometry) == 2
+
+        export = scene.export(file_type='gltf')
+        tree = g.json.loads(export['model.gltf'].decode('utf-8'))
+        # the shared image should only be included once
+        assert len(tree['images']) == 1
+        assert len(tree['textures']) == 1
+        # the shared material should also only be included once
+        assert len(tree['materials']) == 1
+        assert all(m['primitives'][0]['material'] == 0
+                   for m in tree['meshes'])
+
+        # a different material sharing the same image
+        b.visual.material = g.trimesh.visual.material.SimpleMaterial(
+            image=a.visual.material.image)
+        export = scene.export(file_type='gltf')
+        tree = g.json.loads(export['model.gltf'].decode('utf-8'))
+        assert len(tree['images']) == 1
+        assert len(tree['textures']) == 1
+        assert len(tree['materials']) == 2
+
+        reloaded = g.trimesh.load(file_obj=None,
+                                  file_type='gltf',
+                                  resolver=export)
+        assert len(reloaded.geometry) == 2
+
+    def test_many_textures(self):
+        # meshes with textures of different sizes
+        original = g.get_mesh('fuze.ply')
+        sizes = [(8 + i, 16) for i in range(5)]
+        meshes = []
+        for i, size in enumerate(sizes):
+            mesh = original.copy()
+            mesh.apply_translation([i * 10, 0, 0])
+            mesh.visual.material = g.trimesh.visual.material.SimpleMaterial(
+                image=original.visual.material.image.resize(size))
+            meshes.append(mesh)
+        scene = g.trimesh.Scene(meshes)
+
+        export = scene.export(file_type='glb')
+        tree = g.trimesh.exchange.gltf.load_glb(
+            g.trimesh.util.wrap_as_stream(export))
+        # images may be encoded in parallel but should
+        # still be stored in the order they were added
+        for name, mesh in scene.geometry.items():
+            loaded = tree['geometry'][name]['visual'].material
+            assert (loaded.baseColorTexture.size ==
+                    mesh.visual.material.image.size)
+
+        # all the data should be bytes after encoding
+        _, items = g.trimesh.exchange.gltf._create_gltf_structure(scene)
+        assert all(isinstance(i, bytes) for i in items)
+
+    def test_material_keys(self):
+        mesh = g.get_mesh('fuze.ply')
+        mesh.visual.material = g.trimesh.visual.material.PBRMaterial(
+            baseColorTexture=mesh.visual.material.image,
+            baseColorFactor=[255, 0, 0, 255],
+            emissiveFactor=[0, 1, 0],
+            metallicFactor=0.5,
+            roughnessFactor=0.25)
+
+        export = mesh.scene().export(file_type='gltf')
+        tree = g.json.loads(export['model.gltf'].decode('utf-8'))
+        material = tree['materials'][0]
+        pmr = material['pbrMetallicRoughness']
+        # spec puts these under the pbrMetallicRoughness key
+        assert g.np.allclose(pmr['baseColorFactor'], [1, 0, 0, 1])
+        assert g.np.isclose(pmr['metallicFactor'], 0.5)
+        assert g.np.isclose(pmr['roughnessFactor'], 0.25)
+        assert pmr['baseColorTexture'] == {'index': 0}
+        # and these at the top level of the material
+        assert g.np.allclose(material['emissiveFactor'], [0, 1, 0])
+        assert set(material.keys()) == set(
+            ['pbrMetallicRoughness', 'emissiveFactor'])
+
+    def test_glb_to(self):
+        scene = g.get_mesh('Duck.glb')
+
+        # write the GLB directly into a file object
+        with g.trimesh.util.BytesIO() as f:
+            length = g.trimesh.exchange.gltf.export_glb_to(
+                scene, file_obj=f)
+            data = f.getvalue()
+        # reported length should match what was written
+        assert length == len(data)
+        # should match the bytes export
+        assert data == scene.export(file_type='glb')
+
+        reloaded = g.trimesh.load(
+            g.trimesh.util.wrap_as_stream(data),
+            file_type='glb')
+        g.scene_equal(scene, reloaded)
+
+    def test_validate(self):
+        scene = g.get_mesh('Duck.glb')
+        strict = g.trimesh.constants.tol.strict
+        try:
+            # schema should only be checked if asked for
+            g.trimesh.constants.tol.strict = False
+            g.trimesh.exchange.gltf._schema_cache.clear()
+            export = g.trimesh.exchange.gltf.export_glb(scene)
+            assert len(g.trimesh.exchange.gltf._schema_cache) == 0
+
+            validated = g.trimesh.exchange.gltf.export_glb(
+                scene, validate=True)
+            assert len(g.trimesh.exchange.gltf._schema_cache) == 1
+        finally:
+            g.trimesh.constants.tol.strict = strict
+        # validating shouldn't change the result
+        assert export == validated
+
+    def test_trs(self):
+        trs = g.trimesh.exchange.gltf._trs_matrices
+        tf = g.trimesh.transformations
+        count = 100
+        translation = g.np.random.random((count, 3)) - .5
+        # doesn't need to be a unit quaternion
+        rotation = g.np.random.random((count, 4)) - .5
+        scale = g.np.random.random((count, 3)) + .1
+        matrices = trs(translation=translation,
+                       rotation=rotation,
+                       scale=scale)
+        assert matrices.shape == (count, 4, 4)
+        for t, r, s, m in zip(translation, rotation, scale, matrices):
+            # compose the matrix from the individual transforms
+            truth = g.np.dot(
+                g.np.dot(tf.translation_matrix(t),
+                         tf.quaternion_matrix(r[[3, 0, 1, 2]])),
+                g.np.diag(g.np.append(s, 1.0)))
+            assert g.np.allclose(m, truth)
+
+        # identity values should produce identity
+        assert g.np.allclose(
+            trs([[0, 0, 0]], [[0, 0, 0, 1]], [[1, 1, 1]]),
+            g.np.eye(4))
+
+        # nodes with a matrix and translation apply both
+        matrix = tf.random_rotation_matrix()
+        matrices = g.trimesh.exchange.gltf._node_matrices(
+            [{}, {'matrix': matrix.T.ravel().tolist(),
+                  'translation': [1, 2, 3]}])
+        assert g.np.allclose(matrices[0], g.np.eye(4))
+        assert g.np.allclose(
+            matrices[1],
+            g.np.dot(matrix, tf.translation_matrix([1, 2, 3])))
+
+    def test_world_node(self):
+        # a header with a node using the default base frame name
+        header = {'scene': 0,
+                  'scenes': [{'nodes': [0]}],
+                  'nodes': [{'name': 'world', 'children': [1]},
+                            {'name': 'child',
+                             'translation': [1.0, 2.0, 3.0]}],
+                  'meshes': [],
+                  'bufferViews': []}
+        kwargs = g.trimesh.exchange.gltf._read_buffers(
+            header=header, buffers=[], mesh_kwargs={})
+        # base frame shouldn't collide with the node name
+        assert kwargs['base_frame'] not in ['world', 'child']
+        edges = [(e['frame_from'], e['frame_to'])
+                 for e in kwargs['graph']]
+        assert edges == [(kwargs['base_frame'], 'world'),
+                         ('world', 'child')]
+
+        # trimesh exports a root node named `world`
+        scene = g.get_mesh('Duck.glb')
+        reloaded = g.trimesh.load(
+            g.trimesh.util.wrap_as_stream(
+                scene.export(file_type='glb')),
+            file_type='glb')
+        # graph should have no self- loops
+        assert all(e[0] != e[1] for e in reloaded.graph.to_edgelist())
+        g.scene_equal(scene, reloaded)
+
+    def test_frame_names(self):
+        # a single triangle
+        faces = g.np.arange(3, dtype=g.np.uint32)
+        vertices = g.np.eye(3, dtype=g.np.float32)
+        data = faces.tobytes() + vertices.tobytes()
+        # node with the mesh, and nodes named like mesh frames
+        decoys = ['A_{:06X}'.format(i) for i in range(20)]
+        nodes = [{'name': 'B', 'mesh': 0,
+                  'translation': [0.0, 7.0, 0.0]}]
+        nodes.extend({'name': name, 'translation': [5.0, 0.0, 0.0]}
+                     for name in decoys)
+        header = {
+            'scene': 0,
+            'scenes': [{'nodes': list(range(len(nodes)))}],
+            'nodes': nodes,
+            'meshes': [{'name': 'A', 'primitives': [
+                {'attributes': {'POSITION': 1}, 'indices': 0}]}],
+            'accessors': [
+                {'bufferView': 0, 'componentType': 5125,
+                 'count': 3, 'type': 'SCALAR'},
+                {'bufferView': 1, 'componentType': 5126,
+                 'count': 3, 'type': 'VEC3'}],
+            'bufferViews': [
+                {'buffer': 0, 'byteLength': 12},
+                {'buffer': 0, 'byteOffset': 12, 'byteLength': 36}]}
+        kwargs = g.trimesh.exchange.gltf._read_buffers(
+            header=header, buffers=[data], mesh_kwargs={})
+        scene = g.trimesh.exchange.load.load_kwargs(kwargs)
+
+        # the mesh frame shouldn't replace any named node
+        frames = scene.graph.nodes_geometry
+        assert len(frames) == 1
+        assert frames[0] not in decoys
+        assert g.np.allclose(scene.graph[frames[0]][0][:3, 3], [0, 7, 0])
+        for name in decoys:
+            assert g.np.allclose(scene.graph[name][0][:3, 3], [5, 0, 0])
+
+        # reloading a reloaded export shouldn't lose nodes
+        truck = g.get_mesh('CesiumMilkTruck.glb')
+        counts = []
+        for _ in range(3):
+            truck = g.trimesh.load(
+                g.trimesh.util.wrap_as_stream(
+                    truck.export(file_type='glb')),
+                file_type='glb')
+            counts.append(len(truck.graph.nodes))
+        assert counts[0] == counts[1]
+        assert len(truck.graph.nodes_geometry) == 5
+
+    def test_read_accessor(self):
+        read = g.trimesh.exchange.gltf._read_accessor
+        # some float32 data behind a byte offset
+        values = g.np.arange(12, dtype=g.np.float32).reshape((-1, 3))
+        data = b'\x00' * 8 + values.tobytes()
+        # buffer views are (buffer, byte offset, byte length)
+        views = [(data, 4, len(data) - 4)]
+        accessor = {'bufferView': 0,
+                    'byteOffset': 4,
+                    'componentType': 5126,
+                    'count': 4,
+                    'type': 'VEC3'}
+        result = read(accessor, views)
+        assert result.shape == (4, 3)
+        assert g.np.allclose(result, values)
+
+        # offsets should add together
+        accessor['byteOffset'] = 16
+        accessor['count'] = 3
+        assert g.np.allclose(read(accessor, views), values[1:])
+
+        # accessors without a buffer view are zeros
+        sparse = read({'componentType': 5125,
+                       'count': 3,
+                       'type': 'SCALAR'}, views)
+        assert sparse.shape == (3,)
+        assert (sparse == 0).all()
+
+    def test_byte_pad(self):
+        pad = g.trimesh.exchange.gltf._byte_pad
+        for length in range(20):
+            data = b'a' * length
+            for bound in [4, 8]:
+                padded = pad(data, bound=bound)
+                # should be aligned and start with original data
+                assert len(padded) % bound == 0
+                assert padded.startswith(data)
+                # binary buffers should be padded with zeros
+                assert padded[length:] == b'\x00' * (
+                    len(padded) - length)
+
 
 if __name__ == '__main__':
     g.trimesh.util.attach_to_log()
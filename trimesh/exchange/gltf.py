@@ -6,17 +6,34 @@ Provides GLTF 2.0 exports of trimesh.Trimesh objects
 as GL_TRIANGLES, and trimesh.Path2D/Path3D as GL_LINES
 """
 
+import copy
 import json
 import base64
+import struct
+import functools
 import collections
+import multiprocessing
 
 import numpy as np
 
+try:
+    # orjson is much faster than the built- in json
+    # but is Python 3 only so we keep it a soft dependency
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # used to encode textures in parallel
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    # Python 2 without the `futures` backport
+    ThreadPoolExecutor = None
+
 from .. import util
 from .. import visual
 from .. import rendering
 from .. import resources
-from .. import transformations
 
 from ..constants import log, tol
 
@@ -26,23 +43,29 @@ _magic = {"gltf": 1179937895,
           "json": 1313821514,
           "bin": 5130562}
 
+# GLB file header: magic, version, length
+# followed by the first chunk's length and type
+_glb_header = struct.Struct("<5I")
+# GLB chunk header: chunk length and chunk type
+_glb_chunk = struct.Struct("<2I")
+
 # GLTF data type codes: little endian numpy dtypes
-_dtypes = {5120: "<i1",
-           5121: "<u1",
-           5122: "<i2",
-           5123: "<u2",
-           5125: "<u4",
-           5126: "<f4"}
-
-# GLTF data formats: numpy shapes
+_dtypes = {5120: np.dtype("<i1"),
+           5121: np.dtype("<u1"),
+           5122: np.dtype("<i2"),
+           5123: np.dtype("<u2"),
+           5125: np.dtype("<u4"),
+           5126: np.dtype("<f4")}
+
+# GLTF data formats: (values per item, numpy shape per item)
 _shapes = {
-    "SCALAR": 1,
-    "VEC2": (2),
-    "VEC3": (3),
-    "VEC4": (4),
-    "MAT2": (2, 2),
-    "MAT3": (3, 3),
-    "MAT4": (4, 4)}
+    "SCALAR": (1, ()),
+    "VEC2": (2, (2,)),
+    "VEC3": (3, (3,)),
+    "VEC4": (4, (4,)),
+    "MAT2": (4, (2, 2)),
+    "MAT3": (9, (3, 3)),
+    "MAT4": (16, (4, 4))}
 
 # a default PBR metallic material
 _default_material = {
@@ -51,6 +74,33 @@ _default_material = {
         "metallicFactor": 0,
         "roughnessFactor": 0}}
 
+# material color factors exported from a PBRMaterial as
+# (key, length, if value may be an integer color,
+#  if stored under the "pbrMetallicRoughness" key)
+_factors = (('baseColorFactor', 4, True, True),
+            ('emissiveFactor', 3, False, False))
+
+# material textures exported from a PBRMaterial as
+# (key, if stored under the "pbrMetallicRoughness" key)
+_textures = (('baseColorTexture', True),
+             ('metallicRoughnessTexture', True),
+             ('emissiveTexture', False),
+             ('normalTexture', False),
+             ('occlusionTexture', False))
+
+# zero padding to reach a 4 byte boundary indexed by count
+_pads = (b'', b'\x00', b'\x00\x00', b'\x00\x00\x00')
+
+# the resolved GLTF 2.0 schema, populated by `_load_schema`
+_schema_cache = {}
+
+# zlib compression level for PNG textures on export
+# where 1 is fastest and 9 produces the smallest files
+png_compress_level = 1
+
+# emit JSON headers without whitespace between items
+_separators = (',', ':')
+
 # specify common dtypes with forced little endian
 float32 = np.dtype("<f4")
 uint32 = np.dtype("<u4")
@@ -59,7 +109,8 @@ uint8 = np.dtype("<u1")
 
 def export_gltf(scene,
                 extras=None,
-                include_normals=False):
+                include_normals=False,
+                validate=False):
     """
     Export a scene object as a GLTF directory.
 
@@ -70,6 +121,9 @@ def export_gltf(scene,
     -----------
     scene : trimesh.Scene
       Scene to be exported
+    validate : bool
+      Flag to check the generated header against the
+      GLTF 2.0 schema, which requires `jsonschema`
 
     Returns
     ----------
@@ -85,7 +139,8 @@ def export_gltf(scene,
     tree, buffer_items = _create_gltf_structure(
         scene=scene,
         extras=extras,
-        include_normals=include_normals)
+        include_normals=include_normals,
+        strict=validate)
 
     # store files as {name : data}
     files = {}
@@ -100,7 +155,8 @@ def export_gltf(scene,
             "byteOffset": 0,
             "byteLength": len(item)}
 
-        buffer_data = _byte_pad(bytes().join(buffer_items[i: i + 2]))
+        # buffer items are already padded to 4 bytes
+        buffer_data = item
         buffer_name = "gltf_buffer_{}.bin".format(i)
         buffers[i] = {
             "uri": buffer_name,
@@ -109,11 +165,14 @@ def export_gltf(scene,
 
     tree["buffers"] = buffers
     tree["bufferViews"] = views
-    files["model.gltf"] = json.dumps(tree).encode("utf-8")
+    files["model.gltf"] = _dumps(tree)
     return files
 
 
-def export_glb(scene, extras=None, include_normals=False):
+def export_glb(scene,
+               extras=None,
+               include_normals=False,
+               validate=False):
     """
     Export a scene as a binary GLTF (GLB) file.
 
@@ -125,12 +184,53 @@ def export_glb(scene, extras=None, include_normals=False):
       Will be stored in the extras field
     include_normals : bool
       Include vertex normals in output file?
+    validate : bool
+      Flag to check the generated header against the
+      GLTF 2.0 schema, which requires `jsonschema`
 
     Returns
     ----------
     exported : bytes
       Exported result in GLB 2.0
     """
+    with util.BytesIO() as f:
+        export_glb_to(scene=scene,
+                      file_obj=f,
+                      extras=extras,
+                      include_normals=include_normals,
+                      validate=validate)
+        return f.getvalue()
+
+
+def export_glb_to(scene,
+                  file_obj,
+                  extras=None,
+                  include_normals=False,
+                  validate=False):
+    """
+    Export a scene as a binary GLTF (GLB) file by writing
+    each chunk directly to a file object, rather than
+    assembling the whole file in memory first.
+
+    Parameters
+    ------------
+    scene: trimesh.Scene
+      Input geometry
+    file_obj : file- like object
+      Open in binary mode, GLB data will be written here
+    extras : JSON serializable
+      Will be stored in the extras field
+    include_normals : bool
+      Include vertex normals in output file?
+    validate : bool
+      Flag to check the generated header against the
+      GLTF 2.0 schema, which requires `jsonschema`
+
+    Returns
+    ----------
+    length : int
+      Number of bytes written to file_obj
+    """
     # if we were passed a bare Trimesh or Path3D object
     if (not util.is_instance_named(scene, "Scene") and
             hasattr(scene, "scene")):
@@ -140,59 +240,58 @@ def export_glb(scene, extras=None, include_normals=False):
     tree, buffer_items = _create_gltf_structure(
         scene=scene,
         extras=extras,
-        include_normals=include_normals)
+        include_normals=include_normals,
+        strict=validate)
 
     # A bufferView is a slice of a file
-    views = []
-    # create the buffer views
+    views = [None] * len(buffer_items)
+    # create the buffer views from the cumulative offsets
+    # as the buffer items are written sequentially
     current_pos = 0
-    for current_item in buffer_items:
-        views.append(
-            {"buffer": 0,
-             "byteOffset": current_pos,
-             "byteLength": len(current_item)})
-        current_pos += len(current_item)
-    # combine bytes into a single blob
-    buffer_data = bytes().join(buffer_items)
+    for i, item in enumerate(buffer_items):
+        size = len(item)
+        views[i] = {"buffer": 0,
+                    "byteOffset": current_pos,
+                    "byteLength": size}
+        current_pos += size
     # add the information about the buffer data
-    tree["buffers"] = [{"byteLength": len(buffer_data)}]
+    tree["buffers"] = [{"byteLength": current_pos}]
     tree["bufferViews"] = views
 
     # export the tree to JSON for the content of the file
-    content = json.dumps(tree)
+    content = _dumps(tree)
     # add spaces to content, so the start of the data
     # is 4 byte aligned as per spec
-    content += (4 - ((len(content) + 20) % 4)) * " "
-    content = content.encode("utf-8")
+    content += b" " * (-len(content) % 4)
     # make sure we didn't screw it up
-    assert (len(content) % 4) == 0
+    if tol.strict:
+        assert (len(content) % 4) == 0
+
+    # length is the total length of the Binary glTF
+    # including Header and all Chunks, in bytes.
+    length = len(content) + current_pos + 28
 
     # the initial header of the file
-    header = _byte_pad(
-        np.array([_magic["gltf"],  # magic, turns into glTF
-                  2,               # GLTF version
-                  # length is the total length of the Binary glTF
-                  # including Header and all Chunks, in bytes.
-                  len(content) + len(buffer_data) + 28,
-                  # contentLength is the length, in bytes,
-                  # of the glTF content (JSON)
-                  len(content),
-                  # magic number which is 'JSON'
-                  1313821514],
-                 dtype="<u4",
-                 ).tobytes())
+    header = _glb_header.pack(
+        _magic["gltf"],  # magic, turns into glTF
+        2,               # GLTF version
+        length,
+        # contentLength is the length, in bytes,
+        # of the glTF content (JSON)
+        len(content),
+        # magic number which is 'JSON'
+        _magic["json"])
 
     # the header of the binary data section
-    bin_header = _byte_pad(
-        np.array([len(buffer_data), 0x004E4942],
-                 dtype="<u4").tobytes())
+    bin_header = _glb_chunk.pack(current_pos, _magic["bin"])
 
-    exported = bytes().join([header,
-                             content,
-                             bin_header,
-                             buffer_data])
+    file_obj.write(header)
+    file_obj.write(content)
+    file_obj.write(bin_header)
+    for item in buffer_items:
+        file_obj.write(item)
 
-    return exported
+    return length
 
 
 def load_gltf(file_obj=None,
@@ -218,15 +317,10 @@ def load_gltf(file_obj=None,
     """
     try:
         # see if we've been passed the GLTF header file
-        tree = json.load(file_obj)
+        tree = _loads(file_obj.read())
     except BaseException:
         # otherwise header should be in 'model.gltf'
-        data = resolver['model.gltf']
-        # old versions of python/json need strings
-        try:
-            tree = json.loads(data)
-        except BaseException:
-            tree = json.loads(data.decode('utf-8'))
+        tree = _loads(resolver['model.gltf'])
 
     # use the URI and resolver to get data from file names
     buffers = [_uri_to_bytes(uri=b['uri'], resolver=resolver)
@@ -263,50 +357,48 @@ def load_glb(file_obj, resolver=None, **mesh_kwargs):
     # against lengths
     start = file_obj.tell()
     # read the first 20 bytes which contain section lengths
-    head_data = file_obj.read(20)
-    head = np.frombuffer(head_data, dtype="<u4")
-
-    # check to make sure first index is gltf
-    # and second is 2, for GLTF 2.0
-    if head[0] != _magic["gltf"] or head[1] != 2:
+    head_data = file_obj.read(_glb_header.size)
+    if len(head_data) != _glb_header.size:
         raise ValueError("file is not GLTF 2.0")
 
+    # magic number, GLTF version
     # overall file length
     # first chunk length
     # first chunk type
-    length, chunk_length, chunk_type = head[2:]
+    (magic, version, length,
+     chunk_length, chunk_type) = _glb_header.unpack(head_data)
+
+    # check to make sure first index is gltf
+    # and second is 2, for GLTF 2.0
+    if magic != _magic["gltf"] or version != 2:
+        raise ValueError("file is not GLTF 2.0")
 
     # first chunk should be JSON header
     if chunk_type != _magic["json"]:
         raise ValueError("no initial JSON header!")
 
-    # uint32 causes an error in read, so we convert to native int
-    # for the length passed to read, for the JSON header
-    json_data = file_obj.read(int(chunk_length))
-    # convert to text
-    if hasattr(json_data, "decode"):
-        json_data = json_data.decode("utf-8")
+    # read the JSON header
+    json_data = file_obj.read(chunk_length)
     # load the json header to native dict
-    header = json.loads(json_data)
+    header = _loads(json_data)
 
     # read the binary data referred to by GLTF as 'buffers'
     buffers = []
     while (file_obj.tell() - start) < length:
         # the last read put us past the JSON chunk
         # we now read the chunk header, which is 8 bytes
-        chunk_head = file_obj.read(8)
-        if len(chunk_head) != 8:
+        chunk_head = file_obj.read(_glb_chunk.size)
+        if len(chunk_head) != _glb_chunk.size:
             # double check to make sure we didn't
             # read the whole file
             break
 
-        chunk_length, chunk_type = np.frombuffer(
-            chunk_head, dtype="<u4")
+        chunk_length, chunk_type = _glb_chunk.unpack(chunk_head)
         # make sure we have the right data type
         if chunk_type != _magic["bin"]:
             raise ValueError("not binary GLTF!")
         # read the chunk
-        chunk_data = file_obj.read(int(chunk_length))
+        chunk_data = file_obj.read(chunk_length)
         if len(chunk_data) != chunk_length:
             raise ValueError("chunk was not expected length!")
         buffers.append(chunk_data)
@@ -319,6 +411,56 @@ def load_glb(file_obj, resolver=None, **mesh_kwargs):
     return kwargs
 
 
+def _dumps(tree):
+    """
+    Serialize a GLTF header to compact UTF-8 JSON, using
+    `orjson` if it is installed.
+
+    Parameters
+    ------------
+    tree : dict
+      JSON serializable GLTF header
+
+    Returns
+    ------------
+    dumped : bytes
+      Header as UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                tree, option=orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            # orjson is stricter about keys and
+            # types so use built- in json for extras
+            log.debug('orjson failed, using json', exc_info=True)
+    return json.dumps(
+        tree, separators=_separators).encode('utf-8')
+
+
+def _loads(data):
+    """
+    Load a GLTF header from JSON, using `orjson`
+    if it is installed.
+
+    Parameters
+    ------------
+    data : str or bytes
+      JSON data
+
+    Returns
+    ------------
+    tree : dict
+      Loaded GLTF header
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    # old versions of python/json need strings
+    if hasattr(data, 'decode'):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
 def _uri_to_bytes(uri, resolver):
     """
     Take a URI string and load it as a
@@ -371,7 +513,11 @@ def _mesh_to_material(mesh, metallic=0.0, rough=0.0):
         color = np.array([100, 100, 100, 255], dtype=np.uint8)
 
     # convert uint color to 0.0-1.0 float color
-    color = color.astype(float32) / np.iinfo(color.dtype).max
+    if color.dtype == np.uint8:
+        # the common case of 8 bit color has a constant max
+        color = color.astype(float32) * (1.0 / 255.0)
+    else:
+        color = color.astype(float32) / np.iinfo(color.dtype).max
 
     material = {
         "pbrMetallicRoughness": {
@@ -384,7 +530,8 @@ def _mesh_to_material(mesh, metallic=0.0, rough=0.0):
 
 def _create_gltf_structure(scene,
                            extras=None,
-                           include_normals=None):
+                           include_normals=False,
+                           strict=False):
     """
     Generate a GLTF header.
 
@@ -396,13 +543,16 @@ def _create_gltf_structure(scene,
       Will be stored in the extras field
     include_normals : bool
       Include vertex normals in output file?
+    strict : bool
+      Validate the header against the GLTF 2.0 schema
 
     Returns
     ---------------
     tree : dict
       Contains required keys for a GLTF scene
     buffer_items : list
-      Contains bytes of data
+      Contains bytes of data, with any deferred
+      image encodes already replaced by their data
     """
     # we are defining a single scene, and will be setting the
     # world node to the 0-index
@@ -427,16 +577,37 @@ def _create_gltf_structure(scene,
     tree.update(nodes)
 
     buffer_items = []
+    # images shared between materials are only added once
+    # {id(image) : index in tree['textures']}
+    texture_cache = {}
+    # materials shared between meshes are only added once
+    # {id(material) : index in tree['materials']}
+    material_cache = {}
+    # checking class names is slow so only do it
+    # once per geometry type {type : class name}
+    kinds = {}
     for name, geometry in scene.geometry.items():
-        if util.is_instance_named(geometry, "Trimesh"):
+        kind = kinds.get(type(geometry))
+        if kind is None:
+            if util.is_instance_named(geometry, "Trimesh"):
+                kind = "Trimesh"
+            elif util.is_instance_named(geometry, "Path"):
+                kind = "Path"
+            else:
+                kind = "unsupported"
+            kinds[type(geometry)] = kind
+
+        if kind == "Trimesh":
             # add the mesh
             _append_mesh(
                 mesh=geometry,
                 name=name,
                 tree=tree,
                 buffer_items=buffer_items,
-                include_normals=include_normals)
-        elif util.is_instance_named(geometry, "Path"):
+                include_normals=include_normals,
+                texture_cache=texture_cache,
+                material_cache=material_cache)
+        elif kind == "Path":
             # add Path2D and Path3D objects
             _append_path(
                 path=geometry,
@@ -452,9 +623,16 @@ def _create_gltf_structure(scene,
     if len(tree['images']) == 0:
         tree.pop('images')
 
-    # in unit tests compare our header against the schema
-    if tol.strict:
+    # replace the deferred images in buffer items with data
+    _encode_images(buffer_items)
+
+    # compare our header against the schema only if asked
+    # or in unit tests, as loading the schema is slow
+    if strict or tol.strict:
         validate(tree)
+    if tol.strict:
+        # every buffer item should be aligned to 4 bytes
+        assert all(len(item) % 4 == 0 for item in buffer_items)
 
     return tree, buffer_items
 
@@ -463,7 +641,9 @@ def _append_mesh(mesh,
                  name,
                  tree,
                  buffer_items,
-                 include_normals):
+                 include_normals,
+                 texture_cache=None,
+                 material_cache=None):
     """
     Append a mesh to the scene structure and put the
     data into buffer_items.
@@ -476,11 +656,20 @@ def _append_mesh(mesh,
       Name of geometry
     tree : dict
       Will be updated with data from mesh
-    buffer_items
-      Will have buffer appended with mesh data
+    buffer_items : (n,) bytes or callable
+      Will have buffer appended with mesh data, textures
+      are appended as callables returning bytes which are
+      replaced with their data by `_encode_images`
     include_normals : bool
       Include vertex normals in export or not
+    texture_cache : None or dict
+      Textures already in tree, {id(image) : texture index}
+    material_cache : None or dict
+      Materials already in tree, {id(material) : material index}
     """
+    if material_cache is None:
+        material_cache = {}
+
     # meshes reference accessor indexes
     # mode 4 is GL_TRIANGLES
     tree["meshes"].append({
@@ -498,35 +687,47 @@ def _append_mesh(mesh,
     if mesh.units is not None and 'meter' not in mesh.units:
         tree["meshes"][-1]["extras"] = {"units": str(mesh.units)}
 
+    # convert mesh data to the correct dtypes once so
+    # the accessor bounds are taken from the stored values
+    # 4 byte dtypes are always aligned so don't need padding
+    # faces: 5125 is an unsigned 32 bit integer
+    faces = np.ascontiguousarray(mesh.faces, dtype=uint32)
+    # vertices: 5126 is a float32
+    vertices = np.ascontiguousarray(mesh.vertices, dtype=float32)
+
+    # the accessor max has to be the exact largest index
+    # so it is taken from the already converted faces
+    # which saves the scan entirely for meshes with no faces
+    if len(faces) > 0:
+        face_max = int(faces.max())
+    else:
+        face_max = 0
+
     # accessors refer to data locations
     # mesh faces are stored as flat list of integers
     tree["accessors"].append({
         "bufferView": len(buffer_items),
         "componentType": 5125,
-        "count": len(mesh.faces) * 3,
-        "max": [int(mesh.faces.max())],
+        "count": len(faces) * 3,
+        "max": [face_max],
         "min": [0],
         "type": "SCALAR"})
-    # convert mesh data to the correct dtypes
-    # faces: 5125 is an unsigned 32 bit integer
-    buffer_items.append(_byte_pad(
-        mesh.faces.astype(uint32).tobytes()))
+    buffer_items.append(faces.tobytes())
 
     # the vertex accessor
     tree["accessors"].append({
         "bufferView": len(buffer_items),
         "componentType": 5126,
-        "count": len(mesh.vertices),
+        "count": len(vertices),
         "type": "VEC3",
         "byteOffset": 0,
-        "max": mesh.vertices.max(axis=0).tolist(),
-        "min": mesh.vertices.min(axis=0).tolist()})
-    # vertices: 5126 is a float32
-    buffer_items.append(_byte_pad(
-        mesh.vertices.astype(float32).tobytes()))
+        "max": vertices.max(axis=0).tolist(),
+        "min": vertices.min(axis=0).tolist()})
+    buffer_items.append(vertices.tobytes())
 
     # make sure nothing fell off the truck
-    assert len(buffer_items) >= tree['accessors'][-1]['bufferView']
+    if tol.strict:
+        assert len(buffer_items) >= tree['accessors'][-1]['bufferView']
 
     # check to see if we have vertex or face colors
     if mesh.visual.kind in ['vertex', 'face']:
@@ -536,7 +737,7 @@ def _append_mesh(mesh,
         tree["meshes"][-1]["primitives"][0]["attributes"][
             "COLOR_0"] = len(tree["accessors"])
         # convert color data to bytes
-        color_data = _byte_pad(vertex_colors.astype(uint8).tobytes())
+        color_data = _byte_pad(_to_bytes(vertex_colors, uint8))
         # the vertex color accessor data
         tree["accessors"].append({
             "bufferView": len(buffer_items),
@@ -549,13 +750,18 @@ def _append_mesh(mesh,
         buffer_items.append(color_data)
 
     elif hasattr(mesh.visual, 'material'):
-        # set the material to the last index in the tree
-        tree["meshes"][-1]["primitives"][0]["material"] = len(tree["materials"])
-        # immediately append the material to materials list
-        # will also append necessary images and textures to tree
-        _append_material(mat=mesh.visual.material,
-                         tree=tree,
-                         buffer_items=buffer_items)
+        material = mesh.visual.material
+        if id(material) not in material_cache:
+            # append the material to materials list
+            # will also append necessary images and textures to tree
+            material_cache[id(material)] = _append_material(
+                mat=material,
+                tree=tree,
+                buffer_items=buffer_items,
+                texture_cache=texture_cache)
+        # reference the material from the primitive
+        tree["meshes"][-1]["primitives"][0]["material"] = material_cache[
+            id(material)]
 
         # if mesh has UV coordinates defined export them
         if (hasattr(mesh.visual, 'uv') and
@@ -565,11 +771,14 @@ def _append_mesh(mesh,
             tree["meshes"][-1]["primitives"][0]["attributes"][
                 "TEXCOORD_0"] = len(tree["accessors"])
 
-            # reverse the Y for GLTF
-            uv = mesh.visual.uv.copy()
-            uv[:, 1] = 1.0 - uv[:, 1]
-            # convert UV coordinate data to bytes and pad
-            uv_data = _byte_pad(uv.astype(float32).tobytes())
+            # reverse the Y for GLTF while converting to float32
+            source = mesh.visual.uv
+            uv = np.empty(source.shape, dtype=float32)
+            uv[:, 0] = source[:, 0]
+            np.subtract(1.0, source[:, 1], out=uv[:, 1])
+            # convert UV coordinate data to bytes
+            # float32 is always 4 byte aligned
+            uv_data = uv.tobytes()
             # add an accessor describing the blob of UV's
             tree["accessors"].append({
                 "bufferView": len(buffer_items),
@@ -580,25 +789,45 @@ def _append_mesh(mesh,
             # immediately add UV data so bufferView indices are correct
             buffer_items.append(uv_data)
 
-    if (include_normals or
-        (include_normals is None and
-         'vertex_normals' in mesh._cache.cache)):
-        # add the reference for vertex color
+    # only include normals if explicitly requested as
+    # computing them may be expensive for large meshes
+    if include_normals:
+        # add the reference for vertex normals
         tree["meshes"][-1]["primitives"][0]["attributes"][
             "NORMAL"] = len(tree["accessors"])
-        normal_data = _byte_pad(mesh.vertex_normals.astype(
-            float32).tobytes())
-        # the vertex color accessor data
+        # float32 is always 4 byte aligned
+        normal_data = _to_bytes(mesh.vertex_normals, float32)
+        # the vertex normal accessor data
         tree["accessors"].append({
             "bufferView": len(buffer_items),
             "componentType": 5126,
             "count": len(mesh.vertices),
             "type": "VEC3",
             "byteOffset": 0})
-        # the actual color data
+        # the actual normal data
         buffer_items.append(normal_data)
 
 
+def _to_bytes(data, dtype):
+    """
+    Convert an array to bytes in a specified dtype, only
+    copying the array once if it is already in that dtype.
+
+    Parameters
+    --------------
+    data : (n,) array
+      Array to be converted
+    dtype : np.dtype
+      Desired dtype of the resulting bytes
+
+    Returns
+    --------------
+    raw : bytes
+      C- order bytes of data in dtype
+    """
+    return np.ascontiguousarray(data, dtype=dtype).tobytes()
+
+
 def _byte_pad(data, bound=4):
     """
     GLTF wants chunks aligned with 4 byte boundaries
@@ -618,22 +847,12 @@ def _byte_pad(data, bound=4):
     padded : bytes
       Result where: (len(padded) % bound) == 0
     """
-    bound = int(bound)
-    if len(data) % bound != 0:
-        # extra bytes to pad with
-        count = bound - (len(data) % bound)
-        # bytes(count) only works on Python 3
-        pad = (' ' * count).encode('utf-8')
-        # combine the padding and data
-        result = bytes().join([data, pad])
-        # we should always divide evenly
-        if (len(result) % bound) != 0:
-            raise ValueError(
-                'byte_pad failed! ori:{} res:{} pad:{} req:{}'.format(
-                    len(data), len(result), count, bound))
-        return result
-
-    return data
+    if bound == 4:
+        # the common case is a lookup of a constant pad
+        return data + _pads[-len(data) & 3]
+    # binary buffers are padded with zeros per the spec
+    # note that bytes(count) only works on Python 3
+    return data + b'\x00' * (-len(data) % int(bound))
 
 
 def _append_path(path, name, tree, buffer_items):
@@ -669,6 +888,11 @@ def _append_path(path, name, tree, buffer_items):
     if path.units is not None and 'meter' not in path.units:
         tree["meshes"][-1]["extras"] = {"units": str(path.units)}
 
+    # data is the second value of the fourth field
+    # which is a (data type, data) tuple of flat 3D points
+    points = np.ascontiguousarray(
+        vxlist[4][1], dtype=float32).reshape((-1, 3))
+
     tree["accessors"].append(
         {
             "bufferView": len(buffer_items),
@@ -676,17 +900,15 @@ def _append_path(path, name, tree, buffer_items):
             "count": vxlist[0],
             "type": "VEC3",
             "byteOffset": 0,
-            "max": path.vertices.max(axis=0).tolist(),
-            "min": path.vertices.min(axis=0).tolist()})
+            "max": points.max(axis=0).tolist(),
+            "min": points.min(axis=0).tolist()})
 
     # TODO add color support to Path object
     # this is just exporting everying as black
     tree["materials"].append(_default_material)
 
-    # data is the second value of the fourth field
-    # which is a (data type, data) tuple
-    buffer_items.append(_byte_pad(
-        vxlist[4][1].astype(float32).tobytes()))
+    # float32 is always 4 byte aligned
+    buffer_items.append(points.tobytes())
 
 
 def _parse_materials(header, views, resolver=None):
@@ -698,8 +920,8 @@ def _parse_materials(header, views, resolver=None):
     ------------
     header : dict
       Contains layout of file
-    views : (n,) bytes
-      Raw data
+    views : (n,) tuple
+      Buffer views as (buffer bytes, byte offset, byte length)
 
     Returns
     ------------
@@ -721,7 +943,8 @@ def _parse_materials(header, views, resolver=None):
         for i, img in enumerate(header["images"]):
             # get the bytes representing an image
             if 'bufferView' in img:
-                blob = views[img["bufferView"]]
+                data, start, length = views[img["bufferView"]]
+                blob = data[start:start + length]
             elif 'uri' in img:
                 # will get bytes from filesystem or base64 URI
                 blob = _uri_to_bytes(uri=img['uri'], resolver=resolver)
@@ -764,6 +987,51 @@ def _parse_materials(header, views, resolver=None):
     return materials
 
 
+def _read_accessor(accessor, views):
+    """
+    Load the data referenced by a GLTF accessor into a
+    numpy array of the correct dtype and shape.
+
+    Parameters
+    -----------
+    accessor : dict
+      GLTF accessor
+    views : (n,) tuple
+      Buffer views as (buffer bytes, byte offset, byte length)
+
+    Returns
+    -----------
+    data : (count, ...) numpy.ndarray
+      Accessor data, read- only if loaded from a buffer view
+    """
+    # number of items
+    count = accessor['count']
+    # what is the datatype
+    dtype = _dtypes[accessor["componentType"]]
+    # number of items when flattened and the shape
+    # of each item, i.e. a (4, 4) MAT4 has 16
+    per_count, per_item = _shapes[accessor["type"]]
+    # use reported count to generate shape
+    shape = (count,) + per_item
+
+    if 'bufferView' not in accessor:
+        # a "sparse" accessor should be initialized as zeros
+        return np.zeros(shape, dtype=dtype)
+
+    # the buffer and where the view starts in it
+    data, start, _ = views[accessor["bufferView"]]
+    # is the accessor offset in the buffer view
+    if "byteOffset" in accessor:
+        start += accessor["byteOffset"]
+    # load the bytes data into correct dtype and shape
+    # without copying anything out of the buffer
+    return np.frombuffer(
+        data,
+        dtype=dtype,
+        count=count * per_count,
+        offset=start).reshape(shape)
+
+
 def _read_buffers(header, buffers, mesh_kwargs, resolver=None):
     """
     Given a list of binary data and a layout, return the
@@ -783,52 +1051,32 @@ def _read_buffers(header, buffers, mesh_kwargs, resolver=None):
     kwargs : dict
       Can be passed to load_kwargs for a trimesh.Scene
     """
-    # split buffer data into buffer views
+    # split buffer data into buffer views, which are stored as
+    # offsets rather than slices so reading them doesn't copy
+    # memoryview slices would also be zero- copy but numpy
+    # can't read them with `np.frombuffer` on Python 2
     views = [None] * len(header["bufferViews"])
     for i, view in enumerate(header["bufferViews"]):
         if "byteOffset" in view:
             start = view["byteOffset"]
         else:
             start = 0
-        end = start + view["byteLength"]
-        views[i] = buffers[view["buffer"]][start:end]
-
-        assert len(views[i]) == view["byteLength"]
-
-    # load data from buffers into numpy arrays
-    # using the layout described by accessors
-    access = [None] * len(header['accessors'])
-    for index, a in enumerate(header["accessors"]):
-        # number of items
-        count = a['count']
-        # what is the datatype
-        dtype = _dtypes[a["componentType"]]
-        # basically how many columns
-        per_item = _shapes[a["type"]]
-        # use reported count to generate shape
-        shape = np.append(count, per_item)
-        # number of items when flattened
-        # i.e. a (4, 4) MAT4 has 16
-        per_count = np.abs(np.product(per_item))
-
-        if 'bufferView' in a:
-            # data was stored in a buffer view so get raw bytes
-            data = views[a["bufferView"]]
-            # is the accessor offset in a buffer
-            if "byteOffset" in a:
-                start = a["byteOffset"]
-            else:
-                # otherwise assume we start at first byte
-                start = 0
-            # length is the number of bytes per item times total
-            length = np.dtype(dtype).itemsize * count * per_count
-            # load the bytes data into correct dtype and shape
-            access[index] = np.frombuffer(
-                data[start:start + length], dtype=dtype).reshape(shape)
-        else:
-            # a "sparse" accessor should be initialized as zeros
-            access[index] = np.zeros(
-                count * per_count, dtype=dtype).reshape(shape)
+        data = buffers[view["buffer"]]
+        views[i] = (data, start, view["byteLength"])
+
+        if tol.strict:
+            assert start + view["byteLength"] <= len(data)
+
+    # load data from buffers into numpy arrays using the layout
+    # described by accessors, but only when they are first
+    # referenced so unused accessors are never loaded
+    access = {}
+
+    def get_accessor(index):
+        if index not in access:
+            access[index] = _read_accessor(
+                header['accessors'][index], views)
+        return access[index]
 
     # load images and textures into material objects
     materials = _parse_materials(
@@ -858,11 +1106,11 @@ def _read_buffers(header, buffers, mesh_kwargs, resolver=None):
             kwargs["metadata"].update(metadata)
 
             # get vertices from accessors
-            kwargs["vertices"] = access[p["attributes"]["POSITION"]]
+            kwargs["vertices"] = get_accessor(p["attributes"]["POSITION"])
 
             # get faces from accessors
             if 'indices' in p:
-                kwargs["faces"] = access[p["indices"]].reshape((-1, 3))
+                kwargs["faces"] = get_accessor(p["indices"]).reshape((-1, 3))
             else:
                 # indices are apparently optional and we are supposed to
                 # do the same thing as webGL drawArrays?
@@ -879,8 +1127,9 @@ def _read_buffers(header, buffers, mesh_kwargs, resolver=None):
                     if "TEXCOORD_0" in p["attributes"]:
                         # flip UV's top- bottom to move origin to lower-left:
                         # https://github.com/KhronosGroup/glTF/issues/1021
-                        uv = access[p["attributes"]["TEXCOORD_0"]].copy()
-                        uv[:, 1] = 1.0 - uv[:, 1]
+                        uv = get_accessor(
+                            p["attributes"]["TEXCOORD_0"]).copy()
+                        np.subtract(1.0, uv[:, 1], out=uv[:, 1])
                         # create a texture visual
                     kwargs["visual"] = visual.texture.TextureVisuals(
                         uv=uv, material=materials[p["material"]])
@@ -914,16 +1163,24 @@ def _read_buffers(header, buffers, mesh_kwargs, resolver=None):
         else:
             names[i] = str(i)
 
-    # make sure we have a unique base frame name
+    # the transform of every node from its parent
+    matrices = _node_matrices(nodes)
+
+    # make sure we have a base frame name that isn't
+    # already the name of a node
+    used = set(names.values())
     base_frame = "world"
-    if base_frame in names:
-        base_frame = str(int(np.random.random() * 1e10))
+    suffix = 0
+    while base_frame in used:
+        base_frame = "world_{}".format(suffix)
+        suffix += 1
     names[base_frame] = base_frame
+    used.add(base_frame)
 
     # visited, kwargs for scene.graph.update
     graph = collections.deque()
-    # unvisited, pairs of node indexes
-    queue = collections.deque()
+    # pairs of node indexes, visited up to `cursor`
+    queue = []
 
     if 'scene' in header:
         # specify the index of scenes if specified
@@ -935,69 +1192,53 @@ def _read_buffers(header, buffers, mesh_kwargs, resolver=None):
     # start the traversal from the base frame to the roots
     for root in header["scenes"][scene_index]["nodes"]:
         # add transform from base frame to these root nodes
-        queue.append([base_frame, root])
+        queue.append((base_frame, root))
 
     # go through the nodes tree to populate
     # kwargs for scene graph loader
-    while len(queue) > 0:
+    cursor = 0
+    while cursor < len(queue):
         # (int, int) pair of node indexes
-        a, b = queue.pop()
+        a, b = queue[cursor]
+        cursor += 1
 
         # dict of child node
         # parent = nodes[a]
         child = nodes[b]
         # add edges of children to be processed
         if "children" in child:
-            queue.extend([[b, i] for i in child["children"]])
+            queue.extend((b, i) for i in child["children"])
 
         # kwargs to be passed to scene.graph.update
-        kwargs = {"frame_from": names[a], "frame_to": names[b]}
-
-        # grab matrix from child
         # parent -> child relationships have matrix stored in child
         # for the transform from parent to child
-        if "matrix" in child:
-            kwargs["matrix"] = np.array(child["matrix"],
-                                        dtype=np.float64).reshape((4, 4)).T
-        else:
-            # if no matrix set identity
-            kwargs["matrix"] = np.eye(4)
-
-        # Now apply keyword translations
-        # GLTF applies these in order: T * R * S
-        if "translation" in child:
-            kwargs["matrix"] = np.dot(
-                kwargs["matrix"],
-                transformations.translation_matrix(child["translation"]))
-
-        if "rotation" in child:
-            # GLTF rotations are stored as (4,) XYZW unit quaternions
-            # we need to re- order to our quaternion style, WXYZ
-            quat = np.reshape(child["rotation"], 4)[[3, 0, 1, 2]]
-
-            # add the rotation to the matrix
-            kwargs["matrix"] = np.dot(
-                kwargs["matrix"], transformations.quaternion_matrix(quat))
-
-        if "scale" in child:
-            # add scale to the matrix
-            kwargs["matrix"] = np.dot(
-                kwargs["matrix"],
-                np.diag(np.concatenate((child['scale'], [1.0]))))
+        kwargs = {"frame_from": names[a],
+                  "frame_to": names[b],
+                  "matrix": matrices[b]}
 
         # append the nodes for connectivity without the mesh
-        graph.append(kwargs.copy())
+        graph.append(kwargs)
         if "mesh" in child:
             # append a new node per- geometry instance
             geometries = mesh_prim[child["mesh"]]
             for name in geometries:
-                kwargs["geometry"] = name
-                kwargs["frame_to"] = "{}_{}".format(
-                    name, util.unique_id(
-                        length=6, increment=len(graph)).upper()
-                )
+                # name the mesh frame with the edge count and
+                # keep counting until it isn't the name of a node
+                # or another mesh frame, as trimesh exports
+                # node names in exactly this format
+                count = len(graph)
+                frame = "{}_{:06X}".format(name, count)
+                while frame in used:
+                    count += 1
+                    frame = "{}_{:06X}".format(name, count)
+                used.add(frame)
                 # append the edge with the mesh frame
-                graph.append(kwargs.copy())
+                # sharing the same parent and matrix
+                graph.append({
+                    "frame_from": kwargs["frame_from"],
+                    "frame_to": frame,
+                    "matrix": kwargs["matrix"],
+                    "geometry": name})
 
     # kwargs to be loaded
     result = {
@@ -1010,6 +1251,102 @@ def _read_buffers(header, buffers, mesh_kwargs, resolver=None):
     return result
 
 
+def _node_matrices(nodes):
+    """
+    Compute the transform from parent to child for
+    every node in a GLTF header at once.
+
+    Parameters
+    ------------
+    nodes : (n,) dict
+      GLTF nodes which may contain a `matrix` and
+      `translation`, `rotation` or `scale` keys
+
+    Returns
+    ------------
+    matrices : (n, 4, 4) float
+      Homogeneous transform of each node
+    """
+    matrices = np.tile(np.eye(4), (len(nodes), 1, 1))
+
+    # nodes with a raw matrix stored in column- major order
+    raw = [i for i, n in enumerate(nodes) if "matrix" in n]
+    if len(raw) > 0:
+        matrices[raw] = np.array(
+            [nodes[i]["matrix"] for i in raw],
+            dtype=np.float64).reshape((-1, 4, 4)).transpose((0, 2, 1))
+
+    # nodes with keyword translations
+    keyed = [i for i, n in enumerate(nodes)
+             if "translation" in n or "rotation" in n or "scale" in n]
+    if len(keyed) > 0:
+        # fill missing keys with the identity value
+        trs = _trs_matrices(
+            translation=[nodes[i].get("translation", [0.0, 0.0, 0.0])
+                         for i in keyed],
+            rotation=[nodes[i].get("rotation", [0.0, 0.0, 0.0, 1.0])
+                      for i in keyed],
+            scale=[nodes[i].get("scale", [1.0, 1.0, 1.0])
+                   for i in keyed])
+        # GLTF applies these after any matrix
+        matrices[keyed] = np.matmul(matrices[keyed], trs)
+
+    return matrices
+
+
+def _trs_matrices(translation, rotation, scale):
+    """
+    Build the homogeneous transforms of GLTF nodes from their
+    translation, rotation and scale, applied as T * R * S.
+
+    Parameters
+    ------------
+    translation : (n, 3) float
+      Translation of each node
+    rotation : (n, 4) float
+      Rotation of each node as an XYZW quaternion
+    scale : (n, 3) float
+      Scale of each node
+
+    Returns
+    ------------
+    matrices : (n, 4, 4) float
+      Homogeneous transformation matrices
+    """
+    translation = np.asanyarray(translation, dtype=np.float64)
+    rotation = np.asanyarray(rotation, dtype=np.float64)
+    scale = np.asanyarray(scale, dtype=np.float64)
+
+    # GLTF rotations are stored as (4,) XYZW unit quaternions
+    x, y, z, w = rotation.T
+    # scale by the squared norm rather than assuming the
+    # quaternions are normalized, and leave zero length
+    # quaternions as an identity rotation
+    norm = (rotation ** 2).sum(axis=1)
+    s = np.zeros(len(rotation))
+    nonzero = norm > tol.zero
+    s[nonzero] = 2.0 / norm[nonzero]
+
+    matrices = np.zeros((len(rotation), 4, 4))
+    matrices[:, 0, 0] = 1.0 - s * (y * y + z * z)
+    matrices[:, 0, 1] = s * (x * y - w * z)
+    matrices[:, 0, 2] = s * (x * z + w * y)
+    matrices[:, 1, 0] = s * (x * y + w * z)
+    matrices[:, 1, 1] = 1.0 - s * (x * x + z * z)
+    matrices[:, 1, 2] = s * (y * z - w * x)
+    matrices[:, 2, 0] = s * (x * z - w * y)
+    matrices[:, 2, 1] = s * (y * z + w * x)
+    matrices[:, 2, 2] = 1.0 - s * (x * x + y * y)
+    matrices[:, 3, 3] = 1.0
+
+    # scaling is diagonal so multiply the columns in place
+    matrices[:, :3, :3] *= scale.reshape((-1, 1, 3))
+    # translation is not affected by rotation or scale
+    matrices[:, :3, 3] = translation
+
+    return matrices
+
+
 def _convert_camera(camera):
     """
     Convert a trimesh camera to a GLTF camera.
@@ -1044,8 +1381,10 @@ def _append_image(img, tree, buffer_items):
       Image object
     tree : dict
       GLTF 2.0 format tree
-    buffer_items : (n,) bytes
-      Binary blobs containing data
+    buffer_items : (n,) bytes or callable
+      Binary blobs containing data, the image will be
+      appended as a callable returning bytes which is
+      replaced with its data by `_encode_images`
 
     Returns
     -----------
@@ -1053,36 +1392,91 @@ def _append_image(img, tree, buffer_items):
       The index of the image in the tree
       None if image append failed for any reason
     """
-    # probably not a PIL image so exit
-    if not hasattr(img, 'format'):
+    try:
+        fmt = img.format
+    except AttributeError:
+        # probably not a PIL image so exit
         return None
 
     # don't re-encode JPEGs
-    if img.format == 'JPEG':
+    if fmt == 'JPEG':
         # no need to mangle JPEGs
         save_as = 'JPEG'
+        options = {}
     else:
         # for everything else just use PNG
         save_as = 'png'
-
-    # get the image data into a bytes object
-    with util.BytesIO() as f:
-        img.save(f, format=save_as)
-        f.seek(0)
-        data = f.read()
+        # the default zlib level is much slower to encode
+        options = {'compress_level': png_compress_level,
+                   'optimize': False}
 
     # append buffer index and the GLTF-acceptable mimetype
     tree['images'].append({
         'bufferView': len(buffer_items),
         'mimeType': 'image/{}'.format(save_as.lower())})
-    # append data so bufferView matches
-    buffer_items.append(_byte_pad(data))
+    # append a placeholder so bufferView matches which
+    # will be replaced with data by `_encode_images`
+    buffer_items.append(functools.partial(
+        _encode_image, img=img, save_as=save_as, options=options))
 
     # index is length minus one
     return len(tree['images']) - 1
 
 
-def _append_material(mat, tree, buffer_items):
+def _encode_image(img, save_as, options):
+    """
+    Encode a PIL image into padded bytes.
+
+    Parameters
+    ------------
+    img : PIL.Image
+      Image object
+    save_as : str
+      Format to pass to PIL, i.e. 'png'
+    options : dict
+      Keyword arguments for the PIL encoder
+
+    Returns
+    ------------
+    data : bytes
+      Encoded image padded to 4 bytes
+    """
+    # get the image data into a bytes object
+    with util.BytesIO() as f:
+        img.save(f, format=save_as, **options)
+        return _byte_pad(f.getvalue())
+
+
+def _encode_images(buffer_items):
+    """
+    Replace deferred image encodes in a list of buffer items
+    with their data. Pillow releases the GIL while encoding
+    so multiple images are encoded in parallel threads.
+
+    Parameters
+    ------------
+    buffer_items : (n,) bytes or callable
+      Will be modified in place to contain only bytes
+    """
+    # indexes of buffer items which need to be encoded
+    pending = [i for i, item in enumerate(buffer_items)
+               if callable(item)]
+    if len(pending) == 0:
+        return
+    if len(pending) == 1 or ThreadPoolExecutor is None:
+        for i in pending:
+            buffer_items[i] = buffer_items[i]()
+        return
+
+    workers = min(len(pending), multiprocessing.cpu_count())
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(buffer_items[i]) for i in pending]
+        # assign results in order so bufferView indexes match
+        for i, future in zip(pending, futures):
+            buffer_items[i] = future.result()
+
+
+def _append_material(mat, tree, buffer_items, texture_cache=None):
     """
     Add passed PBRMaterial as GLTF 2.0 specification JSON
     serializable data:
@@ -1097,9 +1491,21 @@ def _append_material(mat, tree, buffer_items):
       Source material to convert
     tree : dict
       GLTF header blob
-    buffer_items : (n,) bytes
-      Binary blobs with various data
+    buffer_items : (n,) bytes or callable
+      Binary blobs with various data, images are appended
+      as callables returning bytes which are replaced with
+      their data by `_encode_images`
+    texture_cache : None or dict
+      Textures already in tree, {id(image) : texture index}
+      Will be updated with any textures added
+
+    Returns
+    ------------
+    index : int
+      The index of the material in the tree
     """
+    if texture_cache is None:
+        texture_cache = {}
 
     # if they have passed a material with
     # a PBR conversion method call it
@@ -1108,68 +1514,72 @@ def _append_material(mat, tree, buffer_items):
         mat = mat.to_pbr()
 
     # a default PBR metallic material
-    pbr = {"pbrMetallicRoughness": {}}
-    try:
-        # try to convert base color to (4,) float color
-        pbr['baseColorFactor'] = visual.color.to_float(
-            mat.baseColorFactor).reshape(4).tolist()
-    except BaseException:
-        pass
-
-    try:
-        pbr['emissiveFactor'] = mat.emissiveFactor.reshape(3).tolist()
-    except BaseException:
-        pass
+    pbr = {}
+    # GLTF would like some keys under "pbrMetallicRoughness"
+    # rather than flattened like our PBRMaterial object
+    pmr = {}
+    for key, length, is_color, nested in _factors:
+        value = getattr(mat, key, None)
+        if value is None:
+            continue
+        try:
+            if is_color:
+                # convert integer colors to float colors
+                value = visual.color.to_float(value)
+            value = np.asanyarray(value, dtype=np.float64).ravel()
+        except (TypeError, ValueError):
+            # not numeric so skip it
+            continue
+        # only export factors of the correct length
+        if len(value) == length:
+            if nested:
+                pmr[key] = value.tolist()
+            else:
+                pbr[key] = value.tolist()
 
     # if scalars are defined correctly export
     if isinstance(mat.metallicFactor, float):
-        pbr['metallicFactor'] = mat.metallicFactor
+        pmr['metallicFactor'] = mat.metallicFactor
     if isinstance(mat.roughnessFactor, float):
-        pbr['roughnessFactor'] = mat.roughnessFactor
+        pmr['roughnessFactor'] = mat.roughnessFactor
 
-    # which keys of the PBRMaterial are images
-    image_mapping = {
-        'baseColorTexture': mat.baseColorTexture,
-        'emissiveTexture': mat.emissiveTexture,
-        'normalTexture': mat.normalTexture,
-        'occlusionTexture': mat.occlusionTexture,
-        'metallicRoughnessTexture': mat.metallicRoughnessTexture}
-
-    for key, img in image_mapping.items():
+    for key, nested in _textures:
+        img = getattr(mat, key, None)
         if img is None:
             continue
-        # try adding the base image to the export object
-        index = _append_image(
-            img=img,
-            tree=tree,
-            buffer_items=buffer_items)
-        # if the image was added successfully it will return index
-        # if it failed for any reason, it will return None
-        if index is not None:
-            # add a reference to the base color texture
-            pbr[key] = {'index': len(tree['textures'])}
-            # add an object for the texture
-            tree['textures'].append({'source': index, 'sampler': 0})
-
-    # for our PBRMaterial object we flatten all keys
-    # however GLTF would like some of them under the
-    # "pbrMetallicRoughness" key
-    pbr_subset = ['baseColorTexture',
-                  'baseColorFactor',
-                  'roughnessFactor',
-                  'metallicRoughnessTexture']
-    # move keys down a level
-    for key in pbr_subset:
-        if key in pbr:
-            pbr["pbrMetallicRoughness"][key] = pbr.pop(key)
-
-    # if we didn't have any PBR keys remove the empty key
-    if len(pbr['pbrMetallicRoughness']) == 0:
-        pbr.pop('pbrMetallicRoughness')
+        if id(img) not in texture_cache:
+            # try adding the base image to the export object
+            index = _append_image(
+                img=img,
+                tree=tree,
+                buffer_items=buffer_items)
+            # if the image was added successfully it will return index
+            # if it failed for any reason, it will return None
+            if index is not None:
+                # add an object for the texture
+                tree['textures'].append({'source': index, 'sampler': 0})
+                index = len(tree['textures']) - 1
+            # images shared between materials are only encoded once
+            texture_cache[id(img)] = index
+        texture = texture_cache[id(img)]
+        if texture is None:
+            continue
+        # add a reference to the texture
+        if nested:
+            pmr[key] = {'index': texture}
+        else:
+            pbr[key] = {'index': texture}
+
+    # only include the key if we had any PBR values
+    if pmr:
+        pbr['pbrMetallicRoughness'] = pmr
 
     # append the new material
     tree['materials'].append(pbr)
 
+    # index is length minus one
+    return len(tree['materials']) - 1
+
 
 def validate(header):
     """
@@ -1190,8 +1600,9 @@ def validate(header):
     """
     # a soft dependency
     import jsonschema
-    # will do the reference replacement
-    schema = get_schema()
+    # validation doesn't modify the schema so
+    # use the cached copy with references replaced
+    schema = _load_schema()
     # validate the passed header against the schema
     return jsonschema.validate(header, schema=schema)
 
@@ -1205,6 +1616,22 @@ def get_schema():
     schema : dict
       A copy of the GLTF 2.0 schema without external references.
     """
+    return copy.deepcopy(_load_schema())
+
+
+def _load_schema():
+    """
+    Load the GLTF 2.0 schema with references resolved, only
+    doing the work the first time it is called.
+
+    Returns
+    ------------
+    schema : dict
+      Cached GLTF 2.0 schema which should not be modified
+    """
+    if 'gltf' in _schema_cache:
+        return _schema_cache['gltf']
+
     # replace references
     from ..schemas import resolve_json
     # get zip resolver to access referenced assets
@@ -1223,6 +1650,8 @@ def get_schema():
         resolve_json(
             resolver.get('glTF.schema.json').decode('utf-8'),
             resolver=resolver))
+    # save the schema so it is only loaded once
+    _schema_cache['gltf'] = schema
     return schema
 
 